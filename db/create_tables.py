@@ -1,17 +1,40 @@
+from sqlalchemy import text, inspect
+
 from db.database import engine, Base
 
-from db.models.user_model import User
-from db.models.project_model import Project
-from db.models.project_user_model import ProjectUser
-from db.models.literature_model import Literature
-from db.models.primary_screening_model import PrimaryScreening
-from db.models.secondary_screening_model import SecondaryScreening 
-from db.models.pdf_download_status_model import PdfDownloadStatus
+import db.models  # registers every model on Base.metadata
+
+# create_all() only creates missing tables; columns / indexes added to
+# existing tables since the first release are brought in here.
+# (table, idempotent DDL) - safe to run on every start
+SCHEMA_UPGRADES = (
+    ("literature", "ALTER TABLE literature ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ DEFAULT now()"),
+    ("literature", "CREATE INDEX IF NOT EXISTS ix_lit_project_article ON literature (project_id, article_id)"),
+    ("literature", "CREATE INDEX IF NOT EXISTS ix_lit_project_keyword ON literature (project_id, keyword_id)"),
+    ("literature", "CREATE INDEX IF NOT EXISTS ix_lit_proj_unique ON literature (project_id, is_unique)"),
+    ("primary_screening", "CREATE INDEX IF NOT EXISTS ix_ps_project_decision ON primary_screening (project_id, decision)"),
+)
+
+
+def upgrade_schema():
+    """
+    Applies SCHEMA_UPGRADES to the tables that exist (missing tables
+    are create_all()'s job). Runs on every app start.
+    Returns the model tables still missing from the database.
+    """
+    with engine.begin() as conn:
+        existing = set(inspect(conn).get_table_names())
+        for table, ddl in SCHEMA_UPGRADES:
+            if table in existing:
+                conn.execute(text(ddl))
+
+    return sorted(set(Base.metadata.tables) - existing)
 
 
 def create_tables():
     Base.metadata.create_all(bind=engine)
-    print("✅ Tables created successfully")
+    upgrade_schema()
+    print(f"✅ Tables created successfully ({len(Base.metadata.tables)} tables)")
 
 
 if __name__ == "__main__":
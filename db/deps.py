@@ -1,10 +1,2 @@
-from db.database import SessionLocal
-from sqlalchemy.orm import Session
-from fastapi import Depends
-
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# Single source for the session dependency; kept for existing imports
+from db.database import get_db
@@ -1 +1,8 @@
-﻿
\ No newline at end of file
+# Importing the package registers every mapper on Base.metadata
+from db.models.user_model import User
+from db.models.project_model import Project
+from db.models.project_user_model import ProjectUser
+from db.models.literature_model import Literature
+from db.models.primary_screening_model import PrimaryScreening
+from db.models.secondary_screening_model import SecondaryScreening
+from db.models.pdf_download_status_model import PdfDownloadStatus
@@ -1,6 +1,6 @@
 from sqlalchemy import (
-    Column, Integer, String, Text, Boolean,
-    ForeignKey, UniqueConstraint
+    Column, Integer, String, Text, Boolean, DateTime,
+    ForeignKey, UniqueConstraint, Index, func
 )
 from sqlalchemy.orm import relationship
 from db.database import Base
@@ -32,9 +32,23 @@ class Literature(Base):
 
     is_unique = Column(Boolean, default=True)
 
-    # __table_args__ = (
-    #     UniqueConstraint("project_id", "article_id", name="uq_project_article"),
-    # )
+    # Bumped on insert / update; versions cached literature views.
+    # Existing databases get it from upgrade_schema() on app start
+    updated_at = Column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        onupdate=func.now()
+    )
+
+    # Repeat PMIDs are stored with is_unique = False, so (project_id, article_id)
+    # is indexed but NOT unique
+    __table_args__ = (
+        Index("ix_lit_project_article", "project_id", "article_id"),
+        Index("ix_lit_project_keyword", "project_id", "keyword_id"),
+        # unique / duplicates views and exports filter on both
+        Index("ix_lit_proj_unique", "project_id", "is_unique"),
+        # UniqueConstraint("project_id", "article_id", name="uq_project_article"),
+    )
 
     #  ORM relationships
     project = relationship(
@@ -59,3 +73,13 @@ class Literature(Base):
         passive_deletes=True
     )
 
+    # Loaded only on access; use selectinload() where PDF info is listed
+    pdf_download_status = relationship(
+        "PdfDownloadStatus",
+        uselist=False,
+        back_populates="literature",
+        lazy="select",
+        cascade="all, delete-orphan",
+        passive_deletes=True
+    )
+
@@ -50,5 +50,6 @@ class PdfDownloadStatus(Base):
 
     literature = relationship(
         "Literature",
+        back_populates="pdf_download_status",
         passive_deletes=True
     )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from db.database import Base
 
@@ -22,6 +22,12 @@ class PrimaryScreening(Base):
     exclusion_criteria = Column(Text)
     rationale = Column(Text)
 
+    # The (project_id, literature_id) primary key already serves the
+    # per-row lookups; this one covers the decision-count GROUP BY
+    __table_args__ = (
+        Index("ix_ps_project_decision", "project_id", "decision"),
+    )
+
     #  ORM relationship
     literature = relationship(
         "Literature",
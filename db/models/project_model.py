@@ -1,5 +1,5 @@
 from sqlalchemy import Column, Integer, String, Date, Text, LargeBinary
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, deferred
 from db.database import Base
 from db.models.project_user_model import ProjectUser
 
@@ -22,7 +22,8 @@ class Project(Base):
     secondary_criteria = Column(Text)
 
     # IFU (single source of truth)
-    ifu_file_data = Column(LargeBinary, nullable=True)
+    # Deferred: PDF bytes load only on access / undefer(), not on every project query
+    ifu_file_data = deferred(Column(LargeBinary, nullable=True), group="ifu")
     ifu_file_name = Column(String, nullable=True)
     ifu_content_type = Column(String, nullable=True)
 
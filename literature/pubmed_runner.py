@@ -1,10 +1,15 @@
+import io
 import os
 import math
 import time
+import threading
 import requests
-import pandas as pd
 import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from functools import lru_cache
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 from services.literature_savedb import save_merged_to_db
 
@@ -15,10 +20,106 @@ EMAIL = os.getenv("NCBI_EMAIL", "sales@iziel.com")
 API_KEY = os.getenv("NCBI_API_KEY")
 
 DEFAULT_SLEEP = 0.34 if not API_KEY else 0.12
+# NCBI: 3 requests/s without an API key, 10 requests/s with one
+REQUESTS_PER_SECOND = 10 if API_KEY else 3
 MAX_RETRIES = 5
+RETRY_JITTER = 0.5       # seconds of random spread added to each backoff
+RETRY_BACKOFF_CAP = 30   # never sleep longer than this between retries
 BATCH_SIZE = 200
+FETCH_WORKERS = 8
+KEYWORD_WORKERS = 4      # keywords whose esearch/efetch overlap
 
-session = requests.Session()
+# ---------------- RATE LIMIT ----------------
+class TokenBucket:
+    """
+    Thread-safe token bucket shared by every NCBI call: average rate
+    stays at the limit, short bursts up to `capacity` go out immediately
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.capacity,
+                    self.tokens + (now - self.updated_at) * self.rate
+                )
+                self.updated_at = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+
+                wait = (1 - self.tokens) / self.rate
+
+            time.sleep(wait)
+
+# No burst: any one-second window stays within NCBI's limit
+ncbi_limiter = TokenBucket(rate=REQUESTS_PER_SECOND, capacity=1)
+
+# ---------------- HTTP SESSION ----------------
+class JitteredRetry(Retry):
+    """
+    Backoff / jitter come from urllib3 itself (backoff_max, backoff_jitter).
+    The subclass only adds what urllib3 can't: a cap on server Retry-After
+    (it would otherwise stall a worker holding a pool slot) and a
+    rate-limit token before every retry attempt.
+    """
+
+    def get_retry_after(self, response):
+        retry_after = super().get_retry_after(response)
+        if retry_after is None:
+            return None
+        return min(RETRY_BACKOFF_CAP, retry_after)
+
+    def sleep(self, response=None):
+        # urllib3 calls this before every retry attempt: after the backoff,
+        # take a rate-limit token so retries count against NCBI's limit too
+        super().sleep(response)
+        ncbi_limiter.acquire()
+
+def _build_session():
+    """
+    Shared session: pooled keep-alive connections for the fetch workers,
+    429 / 5xx, connection errors and timeouts retried with jittered
+    exponential backoff by urllib3
+    """
+    retry = JitteredRetry(
+        total=MAX_RETRIES,
+        backoff_factor=DEFAULT_SLEEP,
+        backoff_jitter=RETRY_JITTER,       # workers don't retry in lockstep
+        backoff_max=RETRY_BACKOFF_CAP,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=["GET"],
+        respect_retry_after_header=True,
+        raise_on_status=False
+    )
+    # One keep-alive connection per fetch worker; block instead of
+    # opening throwaway connections when the pool is exhausted
+    adapter = HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=FETCH_WORKERS,
+        pool_block=True,
+        max_retries=retry
+    )
+
+    s = requests.Session()
+    s.headers.update({
+        "User-Agent": f"{TOOL} ({EMAIL})",
+        "Accept-Encoding": "gzip, deflate"
+    })
+    s.mount("https://", adapter)
+    s.mount("http://", adapter)
+    return s
+
+session = _build_session()
 
 # ---------------- HELPERS ----------------
 def _common_params():
@@ -27,63 +128,65 @@ def _common_params():
         p["api_key"] = API_KEY
     return p
 
-def safe_request(func, *args, **kwargs):
-    retries = 0
-    while True:
-        try:
-            return func(*args, **kwargs)
-        except requests.exceptions.HTTPError as e:
-            if e.response.status_code == 429 and retries < MAX_RETRIES:
-                wait = (2 ** retries) * DEFAULT_SLEEP
-                print(f"429 retry after {wait:.1f}s")
-                time.sleep(wait)
-                retries += 1
-            else:
-                raise
+# One str.translate pass instead of a chain of str.replace scans
+SANITIZE_TABLE = str.maketrans({
+    "\x00": None,
+    "“": '"', "”": '"',
+    "‘": "'", "’": "'",
+    "\u00A0": " ",
+    "\u2013": "-", "\u2014": "-",
+    "\n": " ", "\r": " ",
+})
 
 def sanitize(text: str) -> str:
     if not text:
         return ""
-    return (
-        text.replace("\x00", "")
-            .replace("“", '"').replace("”", '"')
-            .replace("‘", "'").replace("’", "'")
-            .replace("\u00A0", " ")
-            .replace("\u2013", "-").replace("\u2014", "-")
-            .replace("\n", " ").replace("\r", " ")
-            .strip()
-    )
+    return text.translate(SANITIZE_TABLE).strip()
+
+@lru_cache(maxsize=8)
+def _availability_clause(apply_abstract: bool, apply_free: bool, apply_full: bool) -> str:
+    availability = []
+    if apply_abstract:
+        availability.append("hasabstract[text]")
+    if apply_free:
+        availability.append("free full text[sb]")
+    if apply_full:
+        availability.append("full text[sb]")
+    return "(" + " OR ".join(availability) + ")" if availability else ""
+
+@lru_cache(maxsize=256)
+def _pubtype_clause(filters_csv: str) -> str:
+    # Keywords of one upload usually share the same filter string
+    filters_csv = sanitize(filters_csv)
+    if not filters_csv:
+        return ""
+
+    types = [t.strip() for t in filters_csv.split(",") if t.strip()]
+    if not types:
+        return ""
+    return "(" + " OR ".join([f'"{t}"[Publication Type]' for t in types]) + ")"
 
 def build_query(keyword: str, filters_csv: str,
                 APPLY_ABSTRACT=True, APPLY_FREE=False, APPLY_FULL=False):
 
     keyword = sanitize(keyword)
-    filters_csv = sanitize(filters_csv)
 
     parts = [f"({keyword})", "english[lang]", "humans[mh]"]
 
-    availability = []
-    if APPLY_ABSTRACT:
-        availability.append("hasabstract[text]")
-    if APPLY_FREE:
-        availability.append("free full text[sb]")
-    if APPLY_FULL:
-        availability.append("full text[sb]")
+    availability = _availability_clause(
+        bool(APPLY_ABSTRACT), bool(APPLY_FREE), bool(APPLY_FULL)
+    )
     if availability:
-        parts.append("(" + " OR ".join(availability) + ")")
+        parts.append(availability)
 
     # Apply publication-type filters from Excel
-    if filters_csv and filters_csv.lower() != "nan":
-        types = [t.strip() for t in filters_csv.split(",") if t.strip()]
-        if types:
-            parts.append(
-                "(" + " OR ".join([f'"{t}"[Publication Type]' for t in types]) + ")"
-            )
+    pubtypes = _pubtype_clause(filters_csv or "")
+    if pubtypes:
+        parts.append(pubtypes)
 
     return " AND ".join(parts)
 
 def esearch_with_history(term: str, mindate=None, maxdate=None):
-    time.sleep(DEFAULT_SLEEP)
     params = {
         "db": "pubmed",
         "term": term,
@@ -94,12 +197,17 @@ def esearch_with_history(term: str, mindate=None, maxdate=None):
         "maxdate": maxdate
     }
     params.update(_common_params())
-    r = safe_request(session.get, BASE_URL + "esearch.fcgi", params=params, timeout=60)
+    ncbi_limiter.acquire()
+    r = session.get(BASE_URL + "esearch.fcgi", params=params, timeout=60)
     r.raise_for_status()
     res = r.json()["esearchresult"]
     return int(res["count"]), res["querykey"], res["webenv"]
 
-def efetch_batch(qk: str, we: str, retstart: int, retmax: int = BATCH_SIZE):
+def efetch_batch(qk: str, we: str, retstart: int, retmax: int = BATCH_SIZE, parsed=None):
+    """
+    Fetches one batch and parses it straight off the socket
+    (no intermediate response.text buffer). Returns parsed rows.
+    """
     params = {
         "db": "pubmed",
         "query_key": qk,
@@ -109,47 +217,142 @@ def efetch_batch(qk: str, we: str, retstart: int, retmax: int = BATCH_SIZE):
         "retmode": "xml",
     }
     params.update(_common_params())
-    r = safe_request(session.get, BASE_URL + "efetch.fcgi", params=params, timeout=120)
-    r.raise_for_status()
-    return r.text
+    ncbi_limiter.acquire()
+    with session.get(
+        BASE_URL + "efetch.fcgi", params=params, stream=True, timeout=120
+    ) as r:
+        r.raise_for_status()
+        r.raw.decode_content = True     # transparently gunzip
+        return xml_to_rows(r.raw, parsed)
 
 def safe_text(el):
     return sanitize(el.text) if el is not None and el.text else ""
 
-def xml_to_rows(xml_text: str):
-    root = ET.fromstring(xml_text)
+# Element paths relative to <PubmedArticle> (no whole-tree "//" scans)
+PMID_PATH = "MedlineCitation/PMID"
+ARTICLE_PATH = "MedlineCitation/Article"
+TITLE_PATH = f"{ARTICLE_PATH}/ArticleTitle"
+JOURNAL_PATH = f"{ARTICLE_PATH}/Journal/Title"
+YEAR_PATH = f"{ARTICLE_PATH}/Journal/JournalIssue/PubDate/Year"
+AUTHOR_PATH = f"{ARTICLE_PATH}/AuthorList/Author"
+PUB_TYPE_PATH = f"{ARTICLE_PATH}/PublicationTypeList/PublicationType"
+DOI_PATH = "PubmedData/ArticleIdList/ArticleId[@IdType='doi']"
+
+def _find_text(el, path: str) -> str:
+    # findtext returns "" for missing nodes / empty text, no None checks
+    return sanitize(el.findtext(path, ""))
+
+def article_to_row(art):
+    pmid = _find_text(art, PMID_PATH)
+    year = _find_text(art, YEAR_PATH)
+    authors = sanitize(", ".join(
+        f"{a.findtext('LastName', '')} {a.findtext('Initials', '')}".strip()
+        for a in art.iterfind(AUTHOR_PATH)
+    ))
+
+    return {
+        "article_id": pmid,
+        "title": _find_text(art, TITLE_PATH),
+        "abstract": " ".join(
+            safe_text(a) for a in art.iter("AbstractText")
+        ),
+        "journal": _find_text(art, JOURNAL_PATH),
+        "publication_year": int(year) if year.isdigit() else None,
+        "author": authors,
+        "publication_type": ", ".join(
+            safe_text(pt) for pt in art.iterfind(PUB_TYPE_PATH)
+        ),
+        "doi": _find_text(art, DOI_PATH),
+        "article_url": f"https://pubmed.ncbi.nlm.nih.gov/{pmid}/" if pmid else "",
+        "source": "PubMed",
+        "is_unique": True
+    }
+
+def xml_to_rows(source, parsed=None):
+    """
+    Streams <PubmedArticle> elements with iterparse; each article is
+    cleared once converted so memory stays flat.
+    source: XML str / bytes or a binary file-like object (e.g. response.raw)
+    parsed: optional PMID -> row dict shared across a run; an article
+            already converted (seen under another keyword) is copied
+            from it instead of being walked again
+    """
+    if isinstance(source, str):
+        source = source.encode("utf-8")
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+
     rows = []
 
-    for art in root.findall(".//PubmedArticle"):
-        pmid = safe_text(art.find(".//PMID"))
-        authors = ", ".join([
-            f"{safe_text(a.find('LastName'))} {safe_text(a.find('Initials'))}".strip()
-            for a in art.findall(".//AuthorList/Author")
-        ])
-
-        rows.append({
-            "article_id": pmid,
-            "title": safe_text(art.find(".//ArticleTitle")),
-            "abstract": " ".join(
-                safe_text(a) for a in art.findall(".//AbstractText")
-            ),
-            "journal": safe_text(art.find(".//Journal/Title")),
-            "publication_year": safe_text(
-                art.find(".//Journal/JournalIssue/PubDate/Year")
-            ),
-            "author": authors,
-            "publication_type": ", ".join(
-                safe_text(pt) for pt in art.findall(".//PublicationType")
-            ),
-            "doi": safe_text(art.find(".//ArticleId[@IdType='doi']")),
-            "article_url": f"https://pubmed.ncbi.nlm.nih.gov/{pmid}/" if pmid else "",
-            "source": "PubMed",
-            "is_unique": True
-        })
+    # "end" events only: half the events of start+end, and the article
+    # subtree is complete when its end tag arrives
+    for _, el in ET.iterparse(source, events=("end",)):
+        if el.tag == "PubmedArticle":
+            pmid = _find_text(el, PMID_PATH)
+
+            if parsed is not None and pmid and pmid in parsed:
+                rows.append(dict(parsed[pmid]))
+            else:
+                row = article_to_row(el)
+                if parsed is not None and pmid:
+                    parsed[pmid] = row
+                rows.append(dict(row) if parsed is not None else row)
+
+            el.clear()
 
     return rows
 
 # ---------------- MAIN PIPELINE ----------------
+def fetch_keyword_records(
+    kw: dict,
+    project_id: int,
+    mindate: str,
+    maxdate: str,
+    apply_abstract=True,
+    apply_free=False,
+    apply_full=False,
+    parsed=None
+) -> list:
+    """
+    esearch + all efetch batches for ONE keyword, rows tagged with
+    project_id / keyword_id
+    """
+    term = build_query(
+        kw.get("keyword", ""),
+        kw.get("filters", ""),
+        APPLY_ABSTRACT=apply_abstract,
+        APPLY_FREE=apply_free,
+        APPLY_FULL=apply_full
+    )
+
+    print(f"\nRunning PubMed for: {kw.get('keyword')}")
+    print(f"Date Range: {mindate} → {maxdate}")
+
+    count, qk, we = esearch_with_history(term, mindate, maxdate)
+    print(f"PubMed results: {count} ({kw.get('keyword')})")
+
+    offsets = [i * BATCH_SIZE for i in range(math.ceil(count / BATCH_SIZE))]
+
+    keyword_id = int(str(kw.get("keyword_no", 0)).replace("#", ""))
+
+    records = []
+
+    # Batches are fetched concurrently; ncbi_limiter keeps the request rate.
+    # Results are consumed as they arrive but in offset order, so the
+    # first-seen PMID (is_unique) stays deterministic.
+    with ThreadPoolExecutor(max_workers=FETCH_WORKERS) as executor:
+        for rows in executor.map(
+            lambda start: efetch_batch(qk, we, start, BATCH_SIZE, parsed),
+            offsets
+        ):
+            for r in rows:
+                r["project_id"] = project_id
+                r["keyword_id"] = keyword_id
+
+            records.extend(rows)
+
+    return records
+
 def run_pubmed_pipeline(
     project_id: int,
     db,
@@ -165,6 +368,8 @@ def run_pubmed_pipeline(
     - Keywords NOT stored in DB
     - Uses project start/end dates ONLY
     - Excel used ONLY for filters
+    - Keywords run concurrently (shared NCBI rate limit), results
+      are collected in keyword order
     """
 
     print(f"Found {len(keywords)} keywords for project {project_id}")
@@ -174,43 +379,30 @@ def run_pubmed_pipeline(
 
     all_records = []
 
-    for kw in keywords:
-        term = build_query(
-            kw.get("keyword", ""),
-            kw.get("filters", ""),
-            APPLY_ABSTRACT=apply_abstract,
-            APPLY_FREE=apply_free,
-            APPLY_FULL=apply_full
-        )
-
-        print(f"\nRunning PubMed for: {kw.get('keyword')}")
-        print(f"Date Range: {mindate} → {maxdate}")
-
-        count, qk, we = esearch_with_history(term, mindate, maxdate)
-        print(f"PubMed results: {count}")
-
-        for i in range(math.ceil(count / BATCH_SIZE)):
-            time.sleep(DEFAULT_SLEEP)
-            xml = efetch_batch(qk, we, i * BATCH_SIZE)
-            rows = xml_to_rows(xml)
-
-            for r in rows:
-                r["project_id"] = project_id
-                r["keyword_id"] = int(
-                    str(kw.get("keyword_no", 0)).replace("#", "")
-                )
-
-            all_records.extend(rows)
+    # PMID -> parsed row, shared by all keywords of this run. Overlapping
+    # keywords reuse the row instead of re-walking the article XML; the
+    # repeat rows are still saved (is_unique=False, see save_merged_to_db)
+    parsed_articles = {}
+
+    with ThreadPoolExecutor(max_workers=KEYWORD_WORKERS) as executor:
+        for records in executor.map(
+            lambda kw: fetch_keyword_records(
+                kw,
+                project_id,
+                mindate,
+                maxdate,
+                apply_abstract=apply_abstract,
+                apply_free=apply_free,
+                apply_full=apply_full,
+                parsed=parsed_articles
+            ),
+            keywords
+        ):
+            all_records.extend(records)
 
     if not all_records:
         print("No literature found.")
         return 0
 
-    df = pd.DataFrame(all_records)
-
-    # Convert numerics safely
-    df["publication_year"] = pd.to_numeric(df["publication_year"], errors="coerce")
-    df["project_id"] = project_id
-    df["keyword_id"] = pd.to_numeric(df["keyword_id"], errors="coerce").fillna(0).astype(int)
-
-    return save_merged_to_db(df=df, db=db, project_id=project_id)
+    # Records go straight to the bulk insert (no DataFrame round-trip)
+    return save_merged_to_db(records=all_records, db=db, project_id=project_id)
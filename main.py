@@ -1,20 +1,57 @@
+import os
+import re
+import asyncio
+import logging
+import anyio.to_thread
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from routers.authRoute import router as auth_router
-from db.database import engine, Base
+from db.create_tables import create_tables, upgrade_schema
+from services.executors import shared_executor, THREAD_POOL_SIZE
 
 from routers.project import router as project_router
 from routers.literature import router as literature_router
 from routers.primary import router as primary_router
 from routers.secondary import router as secondary_router
 
+# Root logging configured once for the app, not as an import side effect
+logging.basicConfig(level=logging.INFO)
+
+# Schema creation is opt-in (RUN_DB_INIT=1) instead of inspecting every
+# table on each worker start / reload; or run `python -m db.create_tables`
+if os.getenv("RUN_DB_INIT") == "1":
+    create_tables()
+else:
+    # Idempotent column / index upgrades always run, so existing
+    # databases never miss a column the models already query
+    missing = upgrade_schema()
+    if missing:
+        logging.getLogger(__name__).warning(
+            "⚠️ DATABASE SCHEMA INCOMPLETE | missing tables: %s | "
+            "start once with RUN_DB_INIT=1 or run `python -m db.create_tables`",
+            ", ".join(missing)
+        )
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Sync endpoints / run_in_threadpool (anyio) and asyncio.to_thread /
+    # run_in_executor(None, ...) share the same THREAD_POOL_SIZE
+    anyio.to_thread.current_default_thread_limiter().total_tokens = THREAD_POOL_SIZE
+    asyncio.get_running_loop().set_default_executor(shared_executor)
+
+    yield
+
+    # Queued work is dropped; tasks already running finish in their threads
+    shared_executor.shutdown(wait=False, cancel_futures=True)
 
-Base.metadata.create_all(bind=engine)
 
 app = FastAPI(
     title="CEP-CER Healthcare API",
     description="Healthcare application with Microsoft Authentication",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS Configuration
@@ -27,10 +64,40 @@ app.add_middleware(
         "http://127.0.0.1:5173",
     ],
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
+    allow_headers=["Authorization", "Content-Type"],
+)
+
+# Downloads whose bodies are already compressed (xlsx is a zip archive,
+# PDFs carry compressed streams): gzip would only burn CPU on them
+UNCOMPRESSED_PATHS = re.compile(
+    r"^/api/("
+    r"literature/export-literature-screen"
+    r"|primary/export-primary-screen"
+    r"|secondary/export-secondary-screen/\d+"
+    r"|secondary/open-pdf"
+    r"|projects/\d+/ifu"
+    r")/?$"
 )
 
+
+class SelectiveGZipMiddleware:
+    """GZipMiddleware for every route except UNCOMPRESSED_PATHS"""
+
+    def __init__(self, app, **gzip_options):
+        self.app = app
+        self.gzip = GZipMiddleware(app, **gzip_options)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and UNCOMPRESSED_PATHS.match(scope["path"]):
+            await self.app(scope, receive, send)
+        else:
+            await self.gzip(scope, receive, send)
+
+
+# Compress JSON responses (master sheets etc.)
+app.add_middleware(SelectiveGZipMiddleware, minimum_size=1024, compresslevel=5)
+
 # Include routers
 app.include_router(auth_router)
 app.include_router(project_router)
@@ -1,18 +1,51 @@
 import os
+import time
+import random
+import logging
 import requests
-import pandas as pd
 import json
 import ast
 import re
 from PyPDF2 import PdfReader
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
 from io import BytesIO
 from PyPDF2 import PdfReader
 
+try:
+    import orjson
+    json_dumps = orjson.dumps
+    json_loads = orjson.loads
+except ImportError:   # stdlib fallback, same behaviour just slower
+    def json_dumps(obj) -> bytes:
+        return json.dumps(obj).encode("utf-8")
+    json_loads = json.loads
+
+logger = logging.getLogger(__name__)
+
 load_dotenv()
 API_URL = os.getenv("PRIMARY_API_URL", "http://localhost:7860/api/v1/run/primaryscreen-1-1-1-1")
 API_KEY = os.getenv("PRIMARY_API_KEY")
 
+# Concurrent Langflow calls per screening run
+LANGFLOW_WORKERS = int(os.getenv("PRIMARY_LANGFLOW_WORKERS", "8"))
+
+# Shared keep-alive session for Langflow (one pooled connection per worker)
+langflow_session = requests.Session()
+langflow_session.mount("http://", HTTPAdapter(pool_maxsize=LANGFLOW_WORKERS))
+langflow_session.mount("https://", HTTPAdapter(pool_maxsize=LANGFLOW_WORKERS))
+
+# Langflow retry policy (429 / 5xx only; other errors fail immediately)
+LANGFLOW_MAX_RETRIES = 5
+LANGFLOW_RETRY_STATUSES = {429, 500, 502, 503, 504}
+LANGFLOW_BACKOFF_CAP = 16
+# (connect, read) seconds; a hung connection is retried instead of
+# holding a worker and a pooled connection forever
+LANGFLOW_TIMEOUT = (
+    float(os.getenv("LANGFLOW_CONNECT_TIMEOUT", "10")),
+    float(os.getenv("LANGFLOW_READ_TIMEOUT", "300")),
+)
+
 
 def read_ifu_from_bytes(pdf_bytes: bytes) -> str:
     reader = PdfReader(BytesIO(pdf_bytes))
@@ -21,9 +54,14 @@ def read_ifu_from_bytes(pdf_bytes: bytes) -> str:
     
 
 
+# Markdown code fences around the model's JSON answer
+FENCE_JSON_RE = re.compile(r"^```json", re.IGNORECASE | re.MULTILINE)
+FENCE_ANY_RE = re.compile(r"^```", re.MULTILINE)
+
+
 def clean_json_text(text: str) -> str:
-    text = re.sub(r"^```json", "", text.strip(), flags=re.IGNORECASE | re.MULTILINE)
-    text = re.sub(r"^```", "", text.strip(), flags=re.MULTILINE)
+    text = FENCE_JSON_RE.sub("", text.strip())
+    text = FENCE_ANY_RE.sub("", text.strip())
     return text.strip("` \n\t")
 
 
@@ -33,7 +71,7 @@ def safe_parse_json(text: str) -> dict:
     Prevents: name 'json' is not defined
     """
     try:
-        return json.loads(text)
+        return json_loads(text)
     except Exception:
         try:
             return ast.literal_eval(text)
@@ -41,8 +79,11 @@ def safe_parse_json(text: str) -> dict:
             raise ValueError(f"Parse error: {e}")
 
 
+# Built once; only the abstract changes between calls
+LANGFLOW_HEADERS = {"Content-Type": "application/json", "x-api-key": API_KEY}
+
+
 def call_langflow(ifu: str, abstract: str):
-    headers = {"Content-Type": "application/json", "x-api-key": API_KEY}
     payload = {
         "output_type": "chat",
         "input_type": "text",
@@ -50,13 +91,50 @@ def call_langflow(ifu: str, abstract: str):
         "tweaks": {"Prompt-QH9TX": {"ifu_text": ifu, "abstract_text": abstract}},
     }
     try:
-        response = requests.post(API_URL, json=payload, headers=headers)
+        response = _post_with_retry(payload, LANGFLOW_HEADERS)
         response.raise_for_status()
-        return response.json()
+        return json_loads(response.content)
     except Exception as e:
         return {"Decision": "ERROR", "Rationale": str(e)}
 
 
+def _retry_wait(response, attempt: int) -> float:
+    """Retry-After if the server sent one, else exponential backoff + jitter; both capped"""
+    retry_after = response.headers.get("Retry-After", "") if response is not None else ""
+    if retry_after.isdigit():
+        return min(LANGFLOW_BACKOFF_CAP, float(retry_after))
+    return min(LANGFLOW_BACKOFF_CAP, 0.5 * 2 ** attempt) + random.random() * 0.3
+
+
+def _post_with_retry(payload: dict, headers: dict):
+    body = json_dumps(payload)   # encoded once, reused across retries
+
+    for attempt in range(LANGFLOW_MAX_RETRIES + 1):
+        try:
+            response = langflow_session.post(
+                API_URL, data=body, headers=headers, timeout=LANGFLOW_TIMEOUT
+            )
+        except requests.Timeout:
+            if attempt == LANGFLOW_MAX_RETRIES:
+                raise
+            status, wait = "timeout", _retry_wait(None, attempt)
+        else:
+            if (
+                response.status_code not in LANGFLOW_RETRY_STATUSES
+                or attempt == LANGFLOW_MAX_RETRIES
+            ):
+                return response
+            status, wait = response.status_code, _retry_wait(response, attempt)
+
+        logger.warning(
+            "LANGFLOW RETRY | status=%s | attempt=%s | wait=%.1fs",
+            status,
+            attempt + 1,
+            wait
+        )
+        time.sleep(wait)
+
+
 def run_primary_screening(input_excel_path: str, ifu_pdf_path: str, output_folder: str, sheet_name="Master") -> str:
     """
     input_excel_path : path to All-Merged.xlsx
@@ -65,6 +143,8 @@ def run_primary_screening(input_excel_path: str, ifu_pdf_path: str, output_folde
     Returns path to output Excel
     """
 
+    import pandas as pd  # only this file-based runner needs it
+
     os.makedirs(output_folder, exist_ok=True)
     ifu_text = read_ifu_from_pdf(ifu_pdf_path)
     df = pd.read_excel(input_excel_path, sheet_name=sheet_name)
@@ -2,24 +2,78 @@ from fastapi import APIRouter, Depends, HTTPException, Header
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 from datetime import datetime
+import hashlib
+import threading
+import time
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from typing import Optional
 
-from db.database import SessionLocal
+from db.database import get_db
 from db.models.user_model import User
+from services.executors import shared_executor
 
 router = APIRouter(
     prefix="/api/auth",
     tags=["Authentication"]
 )
 
-# Database Session
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+GRAPH_ME_URL = "https://graph.microsoft.com/v1.0/me"
+
+# Shared Graph session: keeps TLS connections to graph.microsoft.com alive
+# across requests instead of a new handshake per login / me call
+graph_session = requests.Session()
+graph_session.mount(
+    "https://",
+    HTTPAdapter(
+        pool_connections=20,
+        pool_maxsize=100,
+        max_retries=Retry(total=2, backoff_factor=0.2, status_forcelist=[429, 503])
+    )
+)
+
+# Graph /me results per access token (tokens live ~1h, so a short TTL is safe)
+GRAPH_CACHE_TTL = 300
+GRAPH_CACHE_MAX = 10000
+_graph_cache = {}          # token hash -> (expires_at, user_data)
+_graph_cache_lock = threading.Lock()
+
+
+def fetch_graph_user(access_token: str):
+    """
+    Returns (status_code, user_data) for Graph /me.
+    Successful lookups are cached for GRAPH_CACHE_TTL seconds; errors are not.
+    """
+    key = hashlib.blake2b(access_token.encode(), digest_size=16).hexdigest()
+    now = time.monotonic()
+
+    with _graph_cache_lock:
+        hit = _graph_cache.get(key)
+        if hit and hit[0] > now:
+            return 200, hit[1]
+
+    graph_response = graph_session.get(
+        GRAPH_ME_URL,
+        headers={"Authorization": f"Bearer {access_token}"},
+        timeout=10
+    )
+
+    if graph_response.status_code != 200:
+        return graph_response.status_code, None
+
+    user_data = graph_response.json()
+
+    with _graph_cache_lock:
+        if len(_graph_cache) >= GRAPH_CACHE_MAX:
+            # Drop expired entries, then the oldest if still full
+            for k in [k for k, (exp, _) in _graph_cache.items() if exp <= now]:
+                del _graph_cache[k]
+            if len(_graph_cache) >= GRAPH_CACHE_MAX:
+                del _graph_cache[next(iter(_graph_cache))]
+        _graph_cache[key] = (now + GRAPH_CACHE_TTL, user_data)
+
+    return 200, user_data
 
 # Request Models
 class AccountInfo(BaseModel):
@@ -40,8 +94,10 @@ async def test_route():
         "timestamp": datetime.utcnow().isoformat()
     }
 
+# Sync handlers on purpose: the Graph call and DB session are blocking,
+# so FastAPI runs them in its threadpool instead of on the event loop
 @router.post("/microsoft")
-async def microsoft_login(
+def microsoft_login(
     request: MicrosoftLoginRequest,
     authorization: str = Header(None),
     db: Session = Depends(get_db)
@@ -57,20 +113,22 @@ async def microsoft_login(
             raise HTTPException(status_code=401, detail="Token mismatch")
         
         print(f" Verifying token with Microsoft Graph API...")
-        graph_response = requests.get(
-            "https://graph.microsoft.com/v1.0/me",
-            headers={"Authorization": f"Bearer {access_token}"},
-            timeout=10
-        )
+        graph_future = shared_executor.submit(fetch_graph_user, access_token)
+
+        # While Graph verifies the token, look up the account the client
+        # claims; only used below if Graph returns the same email
+        hinted_email = request.account.username
+        hinted_user = db.query(User).filter(User.email == hinted_email).first()
+
+        status_code, user_data = graph_future.result()
         
-        if graph_response.status_code != 200:
-            print(f" Microsoft Graph API error: {graph_response.status_code}")
+        if status_code != 200:
+            print(f" Microsoft Graph API error: {status_code}")
             raise HTTPException(
                 status_code=401, 
-                detail=f"Invalid access token: {graph_response.status_code}"
+                detail=f"Invalid access token: {status_code}"
             )
         
-        user_data = graph_response.json()
         print(f" Microsoft Graph API response: {user_data}")
         
         email = user_data.get("mail") or user_data.get("userPrincipalName")
@@ -82,7 +140,10 @@ async def microsoft_login(
         
         print(f" User info - Email: {email}, Name: {name}, MS ID: {microsoft_id}")
         
-        user = db.query(User).filter(User.email == email).first()
+        if email == hinted_email:
+            user = hinted_user
+        else:
+            user = db.query(User).filter(User.email == email).first()
         
         if not user:
             print(f" Creating new user...")
@@ -146,7 +207,7 @@ async def microsoft_login(
         raise HTTPException(status_code=500, detail=f"Authentication failed: {str(e)}")
 
 @router.get("/me")
-async def get_current_user(
+def get_current_user(
     authorization: str = Header(None),
     db: Session = Depends(get_db)
 ):
@@ -157,16 +218,11 @@ async def get_current_user(
     access_token = authorization.split("Bearer ")[1]
     
     try:
-        graph_response = requests.get(
-            "https://graph.microsoft.com/v1.0/me",
-            headers={"Authorization": f"Bearer {access_token}"},
-            timeout=10
-        )
+        status_code, user_data = fetch_graph_user(access_token)
         
-        if graph_response.status_code != 200:
+        if status_code != 200:
             raise HTTPException(status_code=401, detail="Invalid token")
         
-        user_data = graph_response.json()
         email = user_data.get("mail") or user_data.get("userPrincipalName")
         
         user = db.query(User).filter(User.email == email).first()
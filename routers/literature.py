@@ -1,38 +1,121 @@
-from fastapi import APIRouter, UploadFile, File, Form, Depends, HTTPException
+from fastapi import APIRouter, Form, Depends, HTTPException, BackgroundTasks, Response, Request
 from sqlalchemy.orm import Session
-from fastapi.responses import StreamingResponse
-from io import BytesIO
-import pandas as pd
-from datetime import datetime
-
-from db.database import get_db
+from fastapi.responses import StreamingResponse, JSONResponse, ORJSONResponse
+from fastapi.concurrency import run_in_threadpool
+from starlette.datastructures import UploadFile as StarletteUploadFile
+import os
+import hashlib
+from concurrent.futures import Future
+import threading
+
+from db.database import get_db, SessionLocal
 from literature.pubmed_runner import run_pubmed_pipeline
 from db.models.literature_model import Literature
-from sqlalchemy import func
+from services.keyword_store import save_keywords, load_keywords
+from services.job_store import create_job, update_job, get_job
+from services.excel_export import stream_xlsx, iter_chunks, XLSX_MEDIA_TYPE
+from services.excel_import import read_excel
+from sqlalchemy import func, select, exists
+
+try:
+    import orjson
+    MasterSheetResponse = ORJSONResponse
+    _dumps = orjson.dumps
+except ImportError:
+    import json
+    MasterSheetResponse = JSONResponse
+
+    def _dumps(obj) -> bytes:
+        return json.dumps(obj, default=str).encode()
+
+KEYWORD_DATE_FORMAT = "%d %B %Y"
+MAX_UPLOAD_BYTES = 10 * 1024 * 1024
+
+# project_id -> Future of the PubMed run currently in progress
+_screening_inflight = {}
+_screening_lock = threading.Lock()
+
+# (project_id, unique_only) -> (version, encoded master sheet JSON)
+EXISTING_CACHE_MAX_BYTES = 64 * 1024 * 1024   # per worker, all entries together
+_existing_cache = {}
+_existing_cache_lock = threading.Lock()
 
-# -------------------------------
-# In-memory store for uploaded keywords (per project)
-keywords_memory = {}
-# -------------------------------
 
 router = APIRouter(
     prefix="/api/literature",
     tags=["Literature Screening"]
 )
 
+MASTER_SHEET_COLUMNS = [
+    "PMID", "Title", "Abstract", "Journal", "Publication Year",
+    "Authors", "Source", "Keyword No.", "Is Unique"
+]
+
+# Nullable master sheet columns that can't be coalesced to "" in SQL
+MASTER_SHEET_NON_TEXT = ("Publication Year", "Keyword No.", "Is Unique")
+
+EXPORT_COLUMNS = [
+    "Keyword No.", "PMID", "Title", "Abstract", "Journal",
+    "Publication Year", "Authors", "Source", "Is Unique"
+]
+
+MAX_PAGE_SIZE = 5000
+
+
+def master_sheet_stmt(conditions: list):
+    """
+    Core select in master sheet order: plain Row tuples, no ORM objects /
+    identity map. Text NULLs come back as "" from the database (coalesce)
+    """
+    return select(
+        Literature.article_id,
+        func.coalesce(Literature.title, ""),
+        func.coalesce(Literature.abstract, ""),
+        func.coalesce(Literature.journal, ""),
+        Literature.publication_year,
+        func.coalesce(Literature.author, ""),
+        Literature.source,
+        Literature.keyword_id,
+        Literature.is_unique
+    ).where(*conditions).order_by(Literature.id)
+
+
+def master_record(row) -> dict:
+    """Only the non-text columns still need None -> "" (what fillna("") used to do)"""
+    record = dict(zip(MASTER_SHEET_COLUMNS, row))
+    for col in MASTER_SHEET_NON_TEXT:
+        if record[col] is None:
+            record[col] = ""
+    return record
+
+
+def literature_conditions(project_id: int, unique_only: bool) -> list:
+    conditions = [Literature.project_id == project_id]
+    if unique_only:
+        conditions.append(Literature.is_unique == True)
+    return conditions
 
-@router.post("/keywords")
-async def upload_keywords(
-    project_id: str = Form(...),
-    keywordsFile: UploadFile = File(...)
-):
-    file_bytes = await keywordsFile.read()
-    if not file_bytes:
+
+def parse_keywords(source) -> list:
+    """
+    Keyword sheet (the upload's spooled file) -> list of keyword dicts.
+    Plain sync function so the endpoint can run it off the event loop.
+    """
+    import pandas as pd  # loaded on first upload, not at worker boot
+
+    # Size check on the spooled upload, without reading it into memory
+    source.seek(0, os.SEEK_END)
+    size = source.tell()
+    source.seek(0)
+
+    if not size:
         raise HTTPException(status_code=400, detail="Empty file uploaded")
+    if size > MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail="Keyword file too large")
 
     # Read Excel
     try:
-        df = pd.read_excel(BytesIO(file_bytes))
+        df = read_excel(source)
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Invalid Excel file: {str(e)}")
 
@@ -45,50 +128,132 @@ async def upload_keywords(
         if col not in df.columns:
             raise HTTPException(status_code=400, detail=f"Missing required column: {col}")
 
-    keywords_memory[project_id] = []
-
-    for _, row in df.iterrows():
-        kw_raw = str(row.get("Keywords", "")).strip()
-        if not kw_raw or kw_raw.lower() == "nan":
-            continue  # skip empty keywords
-
-        # Parse date range
-        from_date, to_date = None, None
-        date_range_raw = str(row.get("Date Range", "")).strip()
-        if "to" in date_range_raw:
-            parts = date_range_raw.split("to")
-            if len(parts) == 2:
-                try:
-                    from_date = datetime.strptime(parts[0].strip(), "%d %B %Y").strftime("%Y/%m/%d")
-                    to_date = datetime.strptime(parts[1].strip(), "%d %B %Y").strftime("%Y/%m/%d")
-                except ValueError:
-                    pass  # leave None if parsing fails
-
-        keywords_memory[project_id].append({
-            "keyword_no": str(row.get("Keyword No.", "")).strip(),
-            "keyword": kw_raw,
-            "filters": str(row.get("Filters", "")).strip(),
-            "from_date": from_date,
-            "to_date": to_date,
-        })
+    # Column-wise cleanup instead of iterrows
+    keywords = df["Keywords"].astype(str).str.strip()
+    mask = df["Keywords"].notna() & (keywords != "")  # skip empty keywords
+    df = df[mask]
+
+    # Parse date range ("01 January 2020 to 31 December 2024"),
+    # left None if parsing fails
+    if "Date Range" in df.columns:
+        span = df["Date Range"].astype(str).str.extract(r"^\s*(.+?)\s+to\s+(.+?)\s*$")
+    else:
+        span = pd.DataFrame({0: None, 1: None}, index=df.index)
+
+    from_dt = pd.to_datetime(span[0], format=KEYWORD_DATE_FORMAT, errors="coerce")
+    to_dt = pd.to_datetime(span[1], format=KEYWORD_DATE_FORMAT, errors="coerce")
+    to_dt = to_dt.where(from_dt.notna())
+
+    filters = (
+        df["Filters"].fillna("").astype(str).str.strip()
+        if "Filters" in df.columns else ""
+    )
+
+    return pd.DataFrame({
+        "keyword_no": df["Keyword No."].astype(str).str.strip(),
+        "keyword": keywords[mask],
+        "filters": filters,
+        "from_date": from_dt.dt.strftime("%Y/%m/%d").where(from_dt.notna(), None),
+        "to_date": to_dt.dt.strftime("%Y/%m/%d").where(to_dt.notna(), None),
+    }).to_dict(orient="records")
+
+
+@router.post("/keywords")
+async def upload_keywords(request: Request):
+    """
+    Multipart form: project_id, keywordsFile.
+    The form is parsed by hand: with Form()/File() params FastAPI spools
+    the whole body before this runs, so Content-Length is checked first.
+    Chunked bodies (no Content-Length) hit the spooled-size check in
+    parse_keywords instead.
+    """
+    content_length = request.headers.get("content-length", "")
+    if content_length.isdigit() and int(content_length) > MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail="Keyword file too large")
+
+    async with request.form() as form:
+        try:
+            project_id = int(form.get("project_id"))
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=422, detail="project_id is required")
+
+        keywordsFile = form.get("keywordsFile")
+        if not isinstance(keywordsFile, StarletteUploadFile):
+            raise HTTPException(status_code=422, detail="keywordsFile is required")
+
+        # Excel parsing is CPU-bound; keep it off the event loop.
+        # Parsed from the spooled upload file, no full bytes copy
+        keywords = await run_in_threadpool(parse_keywords, keywordsFile.file)
+
+    await run_in_threadpool(save_keywords, project_id, keywords)
 
     return {
         "status": "success",
         "project_id": project_id,
-        "keywords_uploaded": len(keywords_memory[project_id])
+        "keywords_uploaded": len(keywords)
     }
 
 
+def run_screening_once(project_id: int, db: Session, keywords: list) -> int:
+    """
+    Single-flight: a second request for a project that is already
+    running waits for that run's result instead of starting another
+    """
+    with _screening_lock:
+        running = _screening_inflight.get(project_id)
+        if running is None:
+            running = _screening_inflight[project_id] = Future()
+            owner = True
+        else:
+            owner = False
+
+    if owner:
+        try:
+            running.set_result(run_pubmed_pipeline(project_id, db, keywords))
+        except Exception as e:
+            running.set_exception(e)
+        finally:
+            with _screening_lock:
+                del _screening_inflight[project_id]
+
+    return running.result()
+
+
+def run_screening_job(job: dict, keywords: list):
+    """Background task: own DB session, result recorded on the job"""
+    db = SessionLocal()
+    try:
+        job = update_job(job, status="running")
+        inserted = run_screening_once(job["project_id"], db, keywords)
+        update_job(job, status="completed", records_saved=inserted)
+    except Exception as e:
+        db.rollback()
+        update_job(job, status="failed", error=str(e))
+    finally:
+        db.close()
+
+
 @router.post("/literature-screen")
 def run_literature_screening(
-    project_id: str = Form(...),
+    background_tasks: BackgroundTasks,
+    response: Response,
+    project_id: int = Form(...),
+    background: bool = Form(False),
     db: Session = Depends(get_db)
 ):
-    if project_id not in keywords_memory or not keywords_memory[project_id]:
+    keywords = load_keywords(project_id)
+    if not keywords:
         raise HTTPException(status_code=400, detail="No keywords uploaded for this project")
 
+    # background=true: return 202 + job id now, poll /literature-screen/jobs/{job_id}
+    if background:
+        job = create_job(project_id=project_id)
+        background_tasks.add_task(run_screening_job, job, keywords)
+        response.status_code = 202
+        return job
+
     try:
-        inserted = run_pubmed_pipeline(project_id, db, keywords_memory[project_id])
+        inserted = run_screening_once(project_id, db, keywords)
         return {
             "status": "success",
             "project_id": project_id,
@@ -98,22 +263,38 @@ def run_literature_screening(
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.get("/literature-screen")
+@router.get("/literature-screen/jobs/{job_id}")
+def get_screening_job(job_id: str):
+    job = get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.get("/literature-screen", response_class=MasterSheetResponse)
 def get_existing_literature(
+    request: Request,
     project_id: int,
     unique_only: bool = True,
+    limit: int | None = None,
+    offset: int = 0,
     db: Session = Depends(get_db)
 ):
-    query = db.query(Literature).filter(
-        Literature.project_id == project_id
-    )
-
-    if unique_only:
-        query = query.filter(Literature.is_unique == True)
-
-    results = query.all()
-
-    if not results:
+    """
+    Whole master sheet by default (existing clients). With `limit`
+    only that page is read and returned along with `next_offset`;
+    /literature-screen/stream serves everything without holding it in RAM.
+    """
+    conditions = literature_conditions(project_id, unique_only)
+
+    if limit is not None:
+        if limit < 1 or offset < 0:
+            raise HTTPException(status_code=400, detail="Invalid limit / offset")
+        limit = min(limit, MAX_PAGE_SIZE)
+
+    # EXISTS probe first: new / not-yet-screened projects return
+    # without running the full projection
+    if not db.execute(select(exists().where(*conditions))).scalar():
         return {
             "exists": False,
             "project_id": project_id,
@@ -121,28 +302,97 @@ def get_existing_literature(
             "masterSheet": []
         }
 
-    df = pd.DataFrame([
-        {
-            "PMID": r.article_id,
-            "Title": r.title,
-            "Abstract": r.abstract,
-            "Journal": r.journal,
-            "Publication Year": r.publication_year,
-            "Authors": r.author,
-            "Source": r.source,
-            "Keyword No.": r.keyword_id,
-            "Is Unique": r.is_unique
-        }
-        for r in results
-    ])
+    # Rows only change through inserts, updates (bump updated_at) and
+    # deletes (drop the count), so (count, max(updated_at)) versions them
+    version = tuple(db.execute(
+        select(func.count(Literature.id), func.max(Literature.updated_at))
+        .where(*conditions)
+    ).one())
+
+    if limit is not None:
+        page = [
+            master_record(row)
+            for row in db.execute(master_sheet_stmt(conditions).limit(limit).offset(offset))
+        ]
+        total = version[0]
+        return MasterSheetResponse({
+            "exists": True,
+            "project_id": project_id,
+            "total_records": total,
+            "masterSheet": page,
+            "next_offset": offset + limit if offset + limit < total else None
+        })
 
-    return {
+    # Same version -> same body: let the browser revalidate with a 304
+    etag = '"' + hashlib.blake2b(
+        repr((project_id, unique_only, version)).encode(), digest_size=16
+    ).hexdigest() + '"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+
+    cache_key = (project_id, unique_only)
+    with _existing_cache_lock:
+        hit = _existing_cache.get(cache_key)
+    if hit and hit[0] == version:
+        # Already-encoded body: no re-serialisation on a hit
+        return Response(hit[1], media_type="application/json", headers={"ETag": etag})
+
+    # Records built straight from the streamed rows
+    master = [
+        master_record(row)
+        for row in db.execute(
+            master_sheet_stmt(conditions).execution_options(yield_per=2000)
+        )
+    ]
+
+    payload = {
         "exists": True,
         "project_id": project_id,
-        "total_records": len(df),
-        "masterSheet": df.fillna("").to_dict(orient="records")
+        "total_records": len(master),
+        "masterSheet": master
     }
 
+    response = MasterSheetResponse(payload, headers={"ETag": etag})
+    body = response.body
+
+    # Bounded by total encoded size (oldest entries dropped first);
+    # a sheet bigger than the whole budget is simply not cached
+    with _existing_cache_lock:
+        _existing_cache.pop(cache_key, None)
+        if len(body) <= EXISTING_CACHE_MAX_BYTES:
+            used = sum(len(b) for _, b in _existing_cache.values())
+            while _existing_cache and used + len(body) > EXISTING_CACHE_MAX_BYTES:
+                _, dropped = _existing_cache.pop(next(iter(_existing_cache)))
+                used -= len(dropped)
+            _existing_cache[cache_key] = (version, body)
+
+    return response
+
+
+@router.get("/literature-screen/stream")
+def stream_existing_literature(
+    project_id: int,
+    unique_only: bool = True
+):
+    """
+    Master sheet as NDJSON, one record per line. Rows come off a
+    server-side cursor in batches of 500, so memory stays flat
+    whatever the project size.
+    """
+    stmt = master_sheet_stmt(literature_conditions(project_id, unique_only))
+
+    def lines():
+        # Own session: the request-scoped one is closed before the body streams
+        db = SessionLocal()
+        try:
+            # stream_results: psycopg named cursor, rows fetched as we go
+            result = db.execute(stmt.execution_options(stream_results=True, yield_per=500))
+            for row in result:
+                yield _dumps(master_record(row)) + b"\n"
+        finally:
+            db.close()
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
 
 
 @router.get("/export-literature-screen")
@@ -151,50 +401,46 @@ def export_literature_results(
     export_type: str = "unique",  # unique | all | duplicates
     db: Session = Depends(get_db)
 ):
-    query = db.query(Literature).filter(
+    # Core select: plain column tuples in sheet order, no ORM objects
+    stmt = select(
+        Literature.keyword_id,
+        Literature.article_id,
+        Literature.title,
+        Literature.abstract,
+        Literature.journal,
+        Literature.publication_year,
+        Literature.author,
+        Literature.source,
+        Literature.is_unique
+    ).where(
         Literature.project_id == project_id
     )
 
     if export_type == "unique":
-        query = query.filter(Literature.is_unique == True)
+        stmt = stmt.where(Literature.is_unique == True)
     elif export_type == "duplicates":
-        query = query.filter(Literature.is_unique == False)
+        stmt = stmt.where(Literature.is_unique == False)
     elif export_type == "all":
         pass
     else:
         raise HTTPException(status_code=400, detail="Invalid export_type")
 
-    results = query.all()
-    if not results:
+    output = stream_xlsx(
+        db.execute(stmt.execution_options(yield_per=1000)),
+        EXPORT_COLUMNS,
+        "Literature"
+    )
+    if output is None:
         raise HTTPException(status_code=404, detail="No literature results found")
 
-    df = pd.DataFrame([
-        {
-            "Keyword No.": r.keyword_id,
-            "PMID": r.article_id,
-            "Title": r.title,
-            "Abstract": r.abstract,
-            "Journal": r.journal,
-            "Publication Year": r.publication_year,
-            "Authors": r.author,
-            "Source": r.source,
-            "Is Unique": r.is_unique
-        }
-        for r in results
-    ])
-
-    output = BytesIO()
-    with pd.ExcelWriter(output, engine="xlsxwriter") as writer:
-        df.to_excel(writer, index=False, sheet_name="Literature")
-
-    output.seek(0)
-
     filename = f"{project_id}_literature_{export_type}.xlsx"
 
     return StreamingResponse(
-        output,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+        iter_chunks(output),
+        media_type=XLSX_MEDIA_TYPE,
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}"'
+        }
     )
 
 
@@ -1,18 +1,38 @@
 from fastapi import APIRouter, Form, Depends, HTTPException
 from sqlalchemy.orm import Session
 import os
+import time
+import threading
 from fastapi.responses import StreamingResponse
-from io import BytesIO
-import pandas as pd
 from db.database import get_db
 from db.models.project_model import Project
 from db.models.primary_screening_model import PrimaryScreening
 from services.primary_screening_service import run_primary_screening_for_project
+from services.ifu_store import load_ifu_bytes
+from services.excel_export import stream_xlsx, iter_chunks, XLSX_MEDIA_TYPE
 from db.models.literature_model import Literature
-from sqlalchemy import func
+from sqlalchemy import func, select, update
+from pydantic import BaseModel
+from typing import List
 
 router = APIRouter(prefix="/api/primary", tags=["Primary Screening"])
 
+PRIMARY_EXPORT_COLUMNS = ["PMID", "Decision", "Exclusion Criteria", "Rationale"]
+
+MAX_PAGE_SIZE = 1000
+
+# Decision-count dashboard cache. Writes through this router bump the
+# project's version; the TTL bounds staleness from other workers
+DECISION_COUNT_TTL = 30
+_decision_counts = {}      # project_id -> (expires_at, version, payload)
+_decision_versions = {}    # project_id -> version
+_decision_counts_lock = threading.Lock()
+
+
+def invalidate_decision_counts(project_id: int):
+    with _decision_counts_lock:
+        _decision_versions[project_id] = _decision_versions.get(project_id, 0) + 1
+
 
 @router.post("/primary-screen")
 def run_primary(
@@ -26,14 +46,14 @@ def run_primary(
     # -------------------------------------------------
     # 1. Validate project
     # -------------------------------------------------
-    project = db.query(Project).filter(Project.id == project_id).first()
-    if not project:
+    if not db.query(Project.id).filter(Project.id == project_id).first():
         raise HTTPException(status_code=404, detail="Project not found")
 
     # -------------------------------------------------
-    # 2. Validate IFU in DB
+    # 2. Validate IFU
     # -------------------------------------------------
-    if not project.ifu_file_data:
+    ifu_bytes = load_ifu_bytes(db, project_id)
+    if not ifu_bytes:
         raise HTTPException(
             status_code=400,
             detail="IFU not found for this project. Upload IFU while creating project."
@@ -45,8 +65,9 @@ def run_primary(
     screened = run_primary_screening_for_project(
         db=db,
         project_id=project_id,
-        ifu_bytes=project.ifu_file_data
+        ifu_bytes=ifu_bytes
     )
+    invalidate_decision_counts(project_id)
 
     return {
         "status": "success",
@@ -58,14 +79,28 @@ def run_primary(
 @router.get("/primary-screen")
 def get_existing_primary(
     project_id: int,
+    after: int | None = None,
+    size: int | None = None,
     db: Session = Depends(get_db)
 ):
     """
-    Fetch primary screening results along with literature details
+    Fetch primary screening results along with literature details.
+    With `size`, returns one page ordered by literature_id starting
+    after the `after` cursor (pass back `next_cursor` for the next page).
     """
 
-    results = (
-        db.query(PrimaryScreening, Literature)
+    # Only the returned columns, as Row tuples streamed in batches
+    # (no ORM objects for either table)
+    rows = (
+        db.query(
+            PrimaryScreening.literature_id,
+            Literature.article_id,
+            Literature.title,
+            Literature.abstract,
+            PrimaryScreening.decision,
+            PrimaryScreening.exclusion_criteria,
+            PrimaryScreening.rationale
+        )
         .join(
             Literature,
             PrimaryScreening.literature_id == Literature.id
@@ -73,27 +108,57 @@ def get_existing_primary(
         .filter(
             PrimaryScreening.project_id == project_id
         )
-        .all()
     )
 
+    if size is not None:
+        if size < 1:
+            raise HTTPException(status_code=400, detail="Invalid page size")
+        size = min(size, MAX_PAGE_SIZE)
+
+        # Keyset page: seeks on the (project_id, literature_id) primary
+        # key, so page N costs the same as page 1 (no OFFSET scan)
+        if after is not None:
+            rows = rows.filter(PrimaryScreening.literature_id > after)
+        rows = rows.order_by(PrimaryScreening.literature_id).limit(size)
+    else:
+        rows = rows.yield_per(500)
+
+    data = [
+        {
+            #  Literature identifiers
+            "literature_id": r.literature_id,
+            "article_id": r.article_id,   # PMID / Article ID
+            "title": r.title,
+            "abstract": r.abstract,
+
+            #  Primary screening
+            "decision": r.decision,
+            "exclusion_criteria": r.exclusion_criteria,
+            "rationale": r.rationale,
+        }
+        for r in rows
+    ]
+
+    if size is not None:
+        # COUNT over the primary key index only, no row data read
+        total = db.scalar(
+            select(func.count())
+            .select_from(PrimaryScreening)
+            .where(PrimaryScreening.project_id == project_id)
+        )
+        has_more = len(data) == size
+        return {
+            "exists": bool(total),
+            "total": total,
+            "data": data,
+            "next_cursor": data[-1]["literature_id"] if has_more else None,
+            "has_more": has_more
+        }
+
     return {
-        "exists": bool(results),
-        "total": len(results),
-        "data": [
-            {
-                #  Literature identifiers
-                "literature_id": ps.literature_id,
-                "article_id": lit.article_id,   # PMID / Article ID
-                "title": lit.title,
-                "abstract": lit.abstract,
-
-                #  Primary screening
-                "decision": ps.decision,
-                "exclusion_criteria": ps.exclusion_criteria,
-                "rationale": ps.rationale,
-            }
-            for ps, lit in results
-        ]
+        "exists": bool(data),
+        "total": len(data),
+        "data": data
     }
 
 
@@ -106,83 +171,125 @@ def export_primary_screen(
     Export primary screening results as Excel
     """
 
-    results = (
-    db.query(PrimaryScreening, Literature)
-    .join(
-        Literature,
-        PrimaryScreening.literature_id == Literature.id
+    # Column tuples streamed straight into a constant_memory workbook
+    rows = (
+        db.query(
+            Literature.article_id,
+            PrimaryScreening.decision,
+            PrimaryScreening.exclusion_criteria,
+            PrimaryScreening.rationale
+        )
+        .join(
+            Literature,
+            PrimaryScreening.literature_id == Literature.id
+        )
+        .filter(PrimaryScreening.project_id == project_id)
+        .yield_per(1000)
     )
-    .filter(PrimaryScreening.project_id == project_id)
-    .all()
-)
 
-
-    if not results:
+    output = stream_xlsx(rows, PRIMARY_EXPORT_COLUMNS, "Primary Screening")
+    if output is None:
         raise HTTPException(
             status_code=404,
             detail="No primary screening results found"
         )
 
-    df = pd.DataFrame([
-    {
-        "PMID": lit.article_id,   
-        "Decision": ps.decision,
-        "Exclusion Criteria": ps.exclusion_criteria,
-        "Rationale": ps.rationale
-    }
-    for ps, lit in results
-])
-
-
-    # Write to Excel
-    output = BytesIO()
-    with pd.ExcelWriter(output, engine="xlsxwriter") as writer:
-        df.to_excel(writer, index=False, sheet_name="Primary Screening")
-
-    output.seek(0)
-
     filename = f"{project_id}_primary_screening.xlsx"
 
     return StreamingResponse(
-        output,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        iter_chunks(output),
+        media_type=XLSX_MEDIA_TYPE,
         headers={
             "Content-Disposition": f'attachment; filename="{filename}"'
         }
     )
 
 
+# =====================================================
+# BULK UPDATE PRIMARY SCREENING (Decision & Rationale)
+# Declared before /{project_id}/{literature_id} so "bulk" isn't
+# matched as a literature_id
+# =====================================================
+class PrimaryDecisionUpdate(BaseModel):
+    literature_id: int
+    decision: str
+    rationale: str | None = None
+
+
+@router.put("/{project_id}/bulk")
+def bulk_update_primary_screening(
+    project_id: int,
+    updates: List[PrimaryDecisionUpdate],
+    db: Session = Depends(get_db)
+):
+    # A literature_id repeated in the payload: last entry wins
+    latest = {u.literature_id: u for u in updates}
+    literature_ids = set(latest)
+
+    # One SELECT for which rows exist, one executemany UPDATE by primary key
+    existing = set(
+        db.scalars(
+            select(PrimaryScreening.literature_id).where(
+                PrimaryScreening.project_id == project_id,
+                PrimaryScreening.literature_id.in_(literature_ids)
+            )
+        )
+    ) if literature_ids else set()
+
+    mappings = [
+        {
+            "project_id": project_id,
+            "literature_id": u.literature_id,
+            "decision": u.decision,
+            "rationale": u.rationale
+        }
+        for u in latest.values()
+        if u.literature_id in existing
+    ]
+
+    if mappings:
+        db.execute(update(PrimaryScreening), mappings)
+        db.commit()
+        invalidate_decision_counts(project_id)
+
+    return {
+        "status": "success",
+        "project_id": project_id,
+        "updated": len(mappings),
+        "not_found": sorted(literature_ids - existing)
+    }
+
+
 # =====================================================
 # UPDATE PRIMARY SCREENING (Decision & Rationale)
 # =====================================================
 @router.put("/{project_id}/{literature_id}")
 def update_primary_screening(
     project_id: int,
-    literature_id: str,
+    literature_id: int,
     decision: str = Form(...),
     rationale: str | None = Form(None),
     db: Session = Depends(get_db)
 ):
-    screening = (
-        db.query(PrimaryScreening)
-        .filter(
+    # One UPDATE by primary key: no SELECT before, no refresh after
+    result = db.execute(
+        update(PrimaryScreening)
+        .where(
             PrimaryScreening.project_id == project_id,
             PrimaryScreening.literature_id == literature_id
         )
-        .first()
+        .values(decision=decision, rationale=rationale)
+        .execution_options(synchronize_session=False)
     )
 
-    if not screening:
+    if not result.rowcount:
         raise HTTPException(
             status_code=404,
             detail="Primary screening record not found"
         )
 
-    screening.decision = decision
-    screening.rationale = rationale
-
     db.commit()
-    db.refresh(screening)
+    invalidate_decision_counts(project_id)
 
     return {
         "status": "success",
@@ -198,7 +305,7 @@ def update_primary_screening(
 @router.delete("/{project_id}/{literature_id}")
 def delete_primary_screening(
     project_id: int,
-    literature_id: str,
+    literature_id: int,
     db: Session = Depends(get_db)
 ):
     screening = (
@@ -218,6 +325,7 @@ def delete_primary_screening(
 
     db.delete(screening)
     db.commit()
+    invalidate_decision_counts(project_id)
 
     return {
         "status": "success",
@@ -253,6 +361,13 @@ def get_primary_screening_decision_count(
     project_id: int,
     db: Session = Depends(get_db)
 ):
+    now = time.monotonic()
+    with _decision_counts_lock:
+        version = _decision_versions.get(project_id, 0)
+        hit = _decision_counts.get(project_id)
+    if hit and hit[0] > now and hit[1] == version:
+        return hit[2]
+
     results = (
         db.query(
             PrimaryScreening.decision,
@@ -268,10 +383,15 @@ def get_primary_screening_decision_count(
         for decision, count in results
     }
 
-    return {
+    payload = {
         "project_id": project_id,
         "decision_counts": decision_counts,
         "total": sum(decision_counts.values())
     }
 
+    with _decision_counts_lock:
+        _decision_counts[project_id] = (now + DECISION_COUNT_TTL, version, payload)
+
+    return payload
+
 
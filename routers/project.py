@@ -1,12 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, undefer
  
-from db.database import SessionLocal
+from db.database import get_db
 from db.models.project_model import Project
 from db.schemas.project_schema import ProjectCreate
 from datetime import date
 import os
-from fastapi.responses import StreamingResponse
+from fastapi.responses import StreamingResponse, FileResponse
+from services.ifu_store import ifu_path, staged_ifu, delete_ifu
+from contextlib import nullcontext
 import io
  
 router = APIRouter(
@@ -15,17 +17,6 @@ router = APIRouter(
 )
  
  
-# =====================================================
-# DB SESSION
-# =====================================================
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
- 
- 
 # =====================================================
 # CREATE PROJECT (POST)
 # =====================================================
@@ -56,24 +47,33 @@ def create_project(
         status="Active"
     )
  
-    if ifu_pdf:
-        if not ifu_pdf.filename.lower().endswith(".pdf"):
-            raise HTTPException(status_code=400, detail="IFU must be a PDF")
+    if ifu_pdf and not ifu_pdf.filename.lower().endswith(".pdf"):
+        raise HTTPException(status_code=400, detail="IFU must be a PDF")
+ 
+    db.add(project)
  
-        pdf_bytes = ifu_pdf.file.read()
-        project.ifu_file_data = pdf_bytes
+    if ifu_pdf:
         project.ifu_file_name = ifu_pdf.filename
         project.ifu_content_type = ifu_pdf.content_type
- 
-    db.add(project)
-    db.commit()
+        db.flush()   # project id for the IFU path
+ 
+        # PDF staged on disk, moved into place only once the row is committed
+        try:
+            with staged_ifu(project.id, ifu_pdf):
+                db.commit()
+        except Exception:
+            db.rollback()
+            delete_ifu(project.id)   # no folder left for a project that doesn't exist
+            raise
+    else:
+        db.commit()
     db.refresh(project)
  
     return {
         "id": project.id,
         "title": project.title,
         "owner": project.owner,              
-        "ifu_uploaded": bool(project.ifu_file_data),
+        "ifu_uploaded": bool(project.ifu_file_name),
         "status": project.status
     }
  
@@ -83,7 +83,19 @@ def create_project(
 # =====================================================
 @router.get("/projects")
 def get_projects(db: Session = Depends(get_db)):
-    projects = db.query(Project).order_by(Project.id.desc()).all()
+    # Projection: only the listed columns, never the IFU columns
+    projects = (
+        db.query(
+            Project.id,
+            Project.title,
+            Project.owner,
+            Project.start_date,
+            Project.end_date,
+            Project.status
+        )
+        .order_by(Project.id.desc())
+        .all()
+    )
  
     return [
         {
@@ -100,9 +112,32 @@ def get_projects(db: Session = Depends(get_db)):
  
 @router.get("/{project_id}/ifu")
 def download_ifu(project_id: int, db: Session = Depends(get_db)):
-    project = db.query(Project).filter(Project.id == project_id).first()
+    project = (
+        db.query(Project.ifu_file_name, Project.ifu_content_type)
+        .filter(Project.id == project_id)
+        .first()
+    )
  
-    if not project or not project.ifu_file_data:
+    if not project or not project.ifu_file_name:
+        raise HTTPException(404, "IFU not found")
+ 
+    path = ifu_path(project_id)
+    if os.path.exists(path):
+        # Served from disk with sendfile, no bytes held in Python
+        return FileResponse(
+            path,
+            media_type=project.ifu_content_type,
+            filename=project.ifu_file_name
+        )
+ 
+    # Projects created before IFUs moved to disk
+    project = (
+        db.query(Project)
+        .options(undefer(Project.ifu_file_data))
+        .filter(Project.id == project_id)
+        .first()
+    )
+    if not project.ifu_file_data:
         raise HTTPException(404, "IFU not found")
  
     return StreamingResponse(
@@ -159,19 +194,20 @@ def update_project(
         if not ifu_pdf.filename.lower().endswith(".pdf"):
             raise HTTPException(status_code=400, detail="IFU must be a PDF")
  
-        pdf_bytes = ifu_pdf.file.read()
-        project.ifu_file_data = pdf_bytes
+        project.ifu_file_data = None   # drop any pre-disk copy
         project.ifu_file_name = ifu_pdf.filename
         project.ifu_content_type = ifu_pdf.content_type
  
-    db.commit()
+    # A new IFU replaces the old file only once the commit succeeds
+    with staged_ifu(project.id, ifu_pdf) if ifu_pdf else nullcontext():
+        db.commit()
     db.refresh(project)
  
     return {
         "status": "success",
         "project_id": project.id,
         "title": project.title,
-        "ifu_uploaded": bool(project.ifu_file_data),
+        "ifu_uploaded": bool(project.ifu_file_name),
         "project_status": project.status
     }
 # =====================================================
@@ -189,25 +225,10 @@ def delete_project(
  
     db.delete(project)
     db.commit()
+    delete_ifu(project_id)
  
     return {
         "status": "success",
         "message": "Project deleted successfully",
         "project_id": project_id
     }
-
-
-@router.get("/{project_id}/ifu")
-def download_ifu(project_id: int, db: Session = Depends(get_db)):
-    project = db.query(Project).filter(Project.id == project_id).first()
-
-    if not project or not project.ifu_file_data:
-        raise HTTPException(404, "IFU not found")
-
-    return StreamingResponse(
-        io.BytesIO(project.ifu_file_data),
-        media_type=project.ifu_content_type,
-        headers={
-            "Content-Disposition": f"attachment; filename={project.ifu_file_name}"
-        }
-    )
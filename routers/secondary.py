@@ -2,8 +2,6 @@ from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
 from sqlalchemy.orm import Session
 from fastapi.responses import StreamingResponse
 import os
-import pandas as pd
-from io import BytesIO
 from pathlib import Path
 from fastapi.responses import FileResponse
 import os
@@ -18,6 +16,8 @@ from secondary.pdf_download_runner import run_pdf_download, get_system_downloads
 from secondary.pdf_to_text_runner import run_pdf_to_text
 from secondary.secondary_runner import run_secondary_screening_db
 from secondary.secondary_runner import run_secondary_screening_selected_db
+from services.excel_export import stream_xlsx, iter_chunks, XLSX_MEDIA_TYPE
+from services.uploads import save_upload
 
 
 router = APIRouter(
@@ -25,6 +25,36 @@ router = APIRouter(
     tags=["Secondary Screening"]
 )
 
+# Export sheet: (header, column) in sheet order
+SECONDARY_EXPORT_COLUMNS = [
+    ("Literature ID", SecondaryScreening.literature_id),
+    ("Summary", SecondaryScreening.summary),
+    ("Study Type", SecondaryScreening.study_type),
+    ("Device", SecondaryScreening.device),
+    ("Sample Size", SecondaryScreening.sample_size),
+
+    ("Appropriate Device", SecondaryScreening.appropriate_device),
+    ("Appropriate Device Application", SecondaryScreening.appropriate_device_application),
+    ("Appropriate Patient Group", SecondaryScreening.appropriate_patient_group),
+    ("Acceptable Report", SecondaryScreening.acceptable_report),
+
+    ("Suitability Score", SecondaryScreening.suitability_score),
+    ("Data Contribution Score", SecondaryScreening.data_contribution_score),
+
+    ("Data Source Type", SecondaryScreening.data_source_type),
+    ("Outcome Measures", SecondaryScreening.outcome_measures),
+    ("Follow Up", SecondaryScreening.follow_up),
+    ("Statistical Significance", SecondaryScreening.statistical_significance),
+    ("Clinical Significance", SecondaryScreening.clinical_significance),
+
+    ("Number of Males", SecondaryScreening.number_of_males),
+    ("Number of Females", SecondaryScreening.number_of_females),
+    ("Mean Age", SecondaryScreening.mean_age),
+
+    ("Result", SecondaryScreening.result),
+    ("Rationale", SecondaryScreening.rationale),
+]
+
 # =====================================================
 # 1️ DOWNLOAD PDFs (PubMed + Included only)
 # =====================================================
@@ -132,8 +162,8 @@ def upload_pdf(
     # 4️ Save PDF (overwrite if exists)
     # ------------------------
     file_path = os.path.join(project_folder, f"{article_id}.pdf")
-    with open(file_path, "wb") as f:
-        f.write(file.file.read())
+    # Chunked copy from the spooled upload, no full bytes copy in memory
+    save_upload(file, file_path)
 
     # ------------------------
     # 5️ Delete old text file if exists
@@ -310,65 +340,29 @@ def export_secondary_results_excel(
     Export secondary screening results as Excel
     """
 
+    # Column tuples streamed straight into a constant_memory workbook
     rows = (
-        db.query(SecondaryScreening)
+        db.query(*[column for _, column in SECONDARY_EXPORT_COLUMNS])
         .filter(SecondaryScreening.project_id == project_id)
-        .all()
+        .yield_per(1000)
     )
 
-    if not rows:
+    output = stream_xlsx(
+        rows,
+        [label for label, _ in SECONDARY_EXPORT_COLUMNS],
+        "Secondary Screening"
+    )
+    if output is None:
         raise HTTPException(
             status_code=404,
             detail="No secondary screening results found for this project"
         )
 
-    # Convert DB rows to list of dicts
-    data = [
-        {
-            "Literature ID": r.literature_id,
-            "Summary": r.summary,
-            "Study Type": r.study_type,
-            "Device": r.device,
-            "Sample Size": r.sample_size,
-
-            "Appropriate Device": r.appropriate_device,
-            "Appropriate Device Application": r.appropriate_device_application,
-            "Appropriate Patient Group": r.appropriate_patient_group,
-            "Acceptable Report": r.acceptable_report,
-
-            "Suitability Score": r.suitability_score,
-            "Data Contribution Score": r.data_contribution_score,
-
-            "Data Source Type": r.data_source_type,
-            "Outcome Measures": r.outcome_measures,
-            "Follow Up": r.follow_up,
-            "Statistical Significance": r.statistical_significance,
-            "Clinical Significance": r.clinical_significance,
-
-            "Number of Males": r.number_of_males,
-            "Number of Females": r.number_of_females,
-            "Mean Age": r.mean_age,
-
-            "Result": r.result,
-            "Rationale": r.rationale,
-        }
-        for r in rows
-    ]
-
-    df = pd.DataFrame(data)
-
-    # Create Excel in-memory
-    output = BytesIO()
-    with pd.ExcelWriter(output, engine="openpyxl") as writer:
-        df.to_excel(writer, index=False, sheet_name="Secondary Screening")
-
-    output.seek(0)
-
     filename = f"secondary_screening_project_{project_id}.xlsx"
 
     return StreamingResponse(
-        output,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        iter_chunks(output),
+        media_type=XLSX_MEDIA_TYPE,
         headers={
             "Content-Disposition": f"attachment; filename={filename}"
         }
@@ -597,8 +591,10 @@ def open_pdf(
 # =====================================================
 # MODULE 2: PDF → TEXT (DB-BASED)
 # =====================================================
+# Sync on purpose: DB query + PyMuPDF conversion are blocking, FastAPI
+# runs a plain def in its threadpool instead of on the event loop
 @router.post("/pdf-to-text")
-async def pdf_to_text(
+def pdf_to_text(
     project_id: int = Form(...),
     db: Session = Depends(get_db)
 ):
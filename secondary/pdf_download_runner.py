@@ -6,7 +6,7 @@ from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
 from webdriver_manager.chrome import ChromeDriverManager
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, selectinload
 
 from db.models.literature_model import Literature
 from db.models.primary_screening_model import PrimaryScreening
@@ -52,6 +52,7 @@ def run_pdf_download(db: Session, project_id: int):
     # ------------------------
     all_literature = (
     db.query(Literature)
+    .options(selectinload(Literature.pdf_download_status))
     .join(PrimaryScreening)
     .filter(
         Literature.project_id == project_id,
@@ -63,12 +64,7 @@ def run_pdf_download(db: Session, project_id: int):
 
 
     for lit in all_literature:
-        exists = (
-            db.query(PdfDownloadStatus)
-            .filter_by(project_id=project_id, literature_id=lit.id)
-            .first()
-        )
-        if not exists:
+        if lit.pdf_download_status is None:
             db.add(
                 PdfDownloadStatus(
                     project_id=project_id,
@@ -83,6 +79,7 @@ def run_pdf_download(db: Session, project_id: int):
     # ------------------------
     pubmed_articles = (
         db.query(Literature, PrimaryScreening)
+        .options(selectinload(Literature.pdf_download_status))
         .join(
             PrimaryScreening,
             Literature.id == PrimaryScreening.literature_id
@@ -123,14 +120,7 @@ def run_pdf_download(db: Session, project_id: int):
     # 5️ Download PDFs
     # ------------------------
     for literature, _ in pubmed_articles:
-        pdf_status = (
-            db.query(PdfDownloadStatus)
-            .filter_by(
-                project_id=project_id,
-                literature_id=literature.id
-            )
-            .first()
-        )
+        pdf_status = literature.pdf_download_status
 
         if pdf_status.status == "downloaded":
             continue
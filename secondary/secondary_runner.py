@@ -9,11 +9,11 @@ from sqlalchemy.orm import Session
 from sqlalchemy import or_
 
 
-from db.models.project_model import Project
 from db.models.primary_screening_model import PrimaryScreening
 from db.models.secondary_screening_model import SecondaryScreening
 from db.models.literature_model import Literature
 from db.models.pdf_download_status_model import PdfDownloadStatus
+from services.ifu_store import load_ifu_bytes
 
 
 load_dotenv()
@@ -108,11 +108,11 @@ def run_secondary_screening_db(
     """
 
     # 1️ Project & IFU
-    project = db.query(Project).filter(Project.id == project_id).first()
-    if not project or not project.ifu_file_data:
+    ifu_bytes = load_ifu_bytes(db, project_id)
+    if not ifu_bytes:
         raise ValueError("IFU not found for project")
 
-    ifu_text = read_ifu_from_bytes(project.ifu_file_data)
+    ifu_text = read_ifu_from_bytes(ifu_bytes)
 
     # 2️ Included primary screenings
     # Get all literature_ids with PDF downloaded or manually uploaded
@@ -321,11 +321,11 @@ def run_secondary_screening_selected_db(
         return 0
 
     # 1️ Project & IFU
-    project = db.query(Project).filter(Project.id == project_id).first()
-    if not project or not project.ifu_file_data:
+    ifu_bytes = load_ifu_bytes(db, project_id)
+    if not ifu_bytes:
         raise ValueError("IFU not found for project")
 
-    ifu_text = read_ifu_from_bytes(project.ifu_file_data)
+    ifu_text = read_ifu_from_bytes(ifu_bytes)
 
     # 2️ Primary screenings (included + selected)
     primaries = (
@@ -0,0 +1,46 @@
+from io import BytesIO
+
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+# Same header look pandas' to_excel produces
+HEADER_FORMAT_SPEC = {"bold": True, "border": 1, "align": "center", "valign": "top"}
+
+
+def stream_xlsx(rows, columns: list, sheet_name: str):
+    """
+    Writes row tuples straight into an xlsx (constant_memory: only the
+    current row is kept, earlier rows are flushed to a temp file).
+    One header format per workbook, data cells are written unformatted.
+    Returns a BytesIO ready to send, or None if there were no rows.
+    """
+    import xlsxwriter  # loaded on first export, not at worker boot
+
+    output = BytesIO()
+    workbook = xlsxwriter.Workbook(output, {"constant_memory": True})
+    worksheet = workbook.add_worksheet(sheet_name)
+    worksheet.write_row(0, 0, columns, workbook.add_format(HEADER_FORMAT_SPEC))
+
+    count = 0
+    for count, row in enumerate(rows, 1):
+        worksheet.write_row(count, 0, row)
+
+    workbook.close()
+
+    if not count:
+        return None
+
+    output.seek(0)
+    return output
+
+
+def iter_chunks(buffer, chunk_size: int = 65536):
+    """
+    Yields a binary buffer in fixed-size chunks. Iterating a BytesIO
+    directly splits on newline bytes, i.e. thousands of tiny random-sized
+    writes for an xlsx / zip payload.
+    """
+    while True:
+        chunk = buffer.read(chunk_size)
+        if not chunk:
+            break
+        yield chunk
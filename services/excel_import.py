@@ -0,0 +1,16 @@
+def read_excel(source, **kwargs):
+    """
+    pd.read_excel with the Rust calamine reader when it can be used.
+    python-calamine is optional: if it isn't installed, or it can't read
+    the file, the read is retried with openpyxl and openpyxl's error (if
+    any) is what the caller sees. `source` is a path or a seekable
+    binary file object.
+    """
+    import pandas as pd  # loaded on first read, not at worker boot
+
+    try:
+        return pd.read_excel(source, engine="calamine", **kwargs)
+    except Exception:
+        if hasattr(source, "seek"):
+            source.seek(0)
+        return pd.read_excel(source, engine="openpyxl", **kwargs)
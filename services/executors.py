@@ -0,0 +1,11 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+# One app-wide pool size for blocking work (sync endpoints, to_thread,
+# short leaf tasks). Default matches anyio's own 40-thread limit.
+THREAD_POOL_SIZE = int(os.getenv("THREAD_POOL_SIZE", "40"))
+
+shared_executor = ThreadPoolExecutor(
+    max_workers=THREAD_POOL_SIZE,
+    thread_name_prefix="app"
+)
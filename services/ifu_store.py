@@ -0,0 +1,56 @@
+import os
+import shutil
+from contextlib import contextmanager
+
+from sqlalchemy.orm import Session
+
+from db.models.project_model import Project
+from services.uploads import stage_upload, discard_staged
+
+# IFU PDFs live on disk, one per project; the project row keeps
+# only the file name / content type
+IFU_STORAGE_DIR = os.getenv("IFU_STORAGE_DIR", os.path.join("database", "projects"))
+
+
+def ifu_path(project_id: int) -> str:
+    return os.path.join(IFU_STORAGE_DIR, str(project_id), "IFU.pdf")
+
+
+@contextmanager
+def staged_ifu(project_id: int, upload):
+    """
+    Streams the upload to a temp file next to the project's IFU and
+    moves it into place only if the with-block (the DB commit) succeeds.
+    On error the temp file is dropped and the current IFU is untouched.
+    """
+    path = ifu_path(project_id)
+    tmp_path = stage_upload(upload, path)
+    try:
+        yield path
+    except BaseException:
+        discard_staged(tmp_path)
+        raise
+
+    os.replace(tmp_path, path)
+
+
+def load_ifu_bytes(db: Session, project_id: int):
+    """
+    IFU PDF bytes for a project, None if there is none.
+    Projects created before IFUs moved to disk still have them
+    in the ifu_file_data column.
+    """
+    path = ifu_path(project_id)
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            return f.read()
+
+    return (
+        db.query(Project.ifu_file_data)
+        .filter(Project.id == project_id)
+        .scalar()
+    )
+
+
+def delete_ifu(project_id: int):
+    shutil.rmtree(os.path.dirname(ifu_path(project_id)), ignore_errors=True)
@@ -0,0 +1,51 @@
+import json
+import time
+import uuid
+import threading
+
+from services.keyword_store import redis_client
+
+# Finished jobs are kept this long for status polling
+JOB_TTL = 24 * 3600
+
+_jobs = {}                 # job_id -> (expires_at, job)
+_jobs_lock = threading.Lock()
+
+
+def _key(job_id: str) -> str:
+    return f"jobs:{job_id}"
+
+
+def save_job(job_id: str, job: dict):
+    if redis_client:
+        redis_client.set(_key(job_id), json.dumps(job), ex=JOB_TTL)
+        return
+
+    now = time.monotonic()
+    with _jobs_lock:
+        for jid in [jid for jid, (exp, _) in _jobs.items() if exp <= now]:
+            del _jobs[jid]
+        _jobs[job_id] = (now + JOB_TTL, job)
+
+
+def create_job(**fields) -> dict:
+    job = {"job_id": uuid.uuid4().hex, "status": "queued", **fields}
+    save_job(job["job_id"], job)
+    return job
+
+
+def update_job(job: dict, **fields) -> dict:
+    job = {**job, **fields}
+    save_job(job["job_id"], job)
+    return job
+
+
+def get_job(job_id: str):
+    """Job dict, or None if unknown / expired"""
+    if redis_client:
+        raw = redis_client.get(_key(job_id))
+        return json.loads(raw) if raw else None
+
+    with _jobs_lock:
+        hit = _jobs.get(job_id)
+    return hit[1] if hit and hit[0] > time.monotonic() else None
@@ -0,0 +1,52 @@
+import os
+import json
+import time
+import threading
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+# Uploaded keywords live until the screening is run (or this expires)
+KEYWORDS_TTL = 3600
+
+REDIS_URL = os.getenv("REDIS_URL")
+
+# Shared across uvicorn workers / replicas when REDIS_URL is set,
+# otherwise keywords stay in this process only
+redis_client = redis.Redis.from_url(REDIS_URL) if redis and REDIS_URL else None
+
+# Per-process store, used only when Redis isn't configured
+_local = {}                # project_id -> (expires_at, rows)
+_local_lock = threading.Lock()
+
+
+def _key(project_id: int) -> str:
+    return f"kw:{project_id}"
+
+
+def save_keywords(project_id: int, rows: list):
+    if redis_client:
+        redis_client.set(_key(project_id), json.dumps(rows), ex=KEYWORDS_TTL)
+        return
+
+    now = time.monotonic()
+    with _local_lock:
+        # Drop expired projects so the store doesn't grow forever
+        for pid in [pid for pid, (exp, _) in _local.items() if exp <= now]:
+            del _local[pid]
+        _local[project_id] = (now + KEYWORDS_TTL, rows)
+
+
+def load_keywords(project_id: int) -> list:
+    """Uploaded keywords for a project, [] if none / expired"""
+    # Always read Redis when shared: a per-process copy could hand a
+    # worker keywords that were re-uploaded through another worker
+    if redis_client:
+        raw = redis_client.get(_key(project_id))
+        return json.loads(raw) if raw else []
+
+    with _local_lock:
+        hit = _local.get(project_id)
+    return hit[1] if hit and hit[0] > time.monotonic() else []
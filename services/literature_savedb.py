@@ -1,29 +1,81 @@
+from sqlalchemy import text, any_, bindparam, String
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.orm import Session
 from db.models.literature_model import Literature
 
 
-def save_merged_to_db(df, db: Session, project_id: int):
+COPY_THRESHOLD = 1000   # batches this large go through COPY instead of INSERT
+
+LITERATURE_COLUMNS = (
+    "project_id",
+    "article_id",
+    "keyword_id",
+    "source",
+    "title",
+    "abstract",
+    "journal",
+    "publication_year",
+    "author",
+    "publication_type",
+    "doi",
+    "article_url",
+    "is_unique",
+)
+
+
+def bulk_insert_with_copy(db: Session, rows: list):
+    """
+    Streams rows into the literature table with COPY ... FROM STDIN.
+    No per-row parse / plan overhead, used for large batches.
+    """
+    sql = (
+        f"COPY {Literature.__tablename__} "
+        f"({', '.join(LITERATURE_COLUMNS)}) FROM STDIN"
+    )
+
+    with db.connection().connection.cursor() as cur:
+        with cur.copy(sql) as copy:
+            for row in rows:
+                copy.write_row(row)
+
+
+def save_merged_to_db(records: list, db: Session, project_id: int):
     """
-    Saves literature into DB
+    Saves literature records (list of dicts from the PubMed runner) into DB
     Rules:
     - First-ever PMID per project → is_unique = True
     - Any repeat PMID (DB or same run) → is_unique = False
+
+    Rows are written with one pipelined executemany (psycopg 3)
+    instead of one ORM round-trip per row, or streamed with COPY
+    once the batch reaches COPY_THRESHOLD.
     """
 
-    inserted = 0
+    # 1️ PMIDs of this batch already present in DB
+    # (served by the (project_id, article_id) index instead of
+    # reading every article_id of the project). Bound as ONE array
+    # parameter: an expanding IN would hit Postgres' 65535-parameter cap
+    run_pmids = {str(r.get("article_id")) for r in records}
 
-    # 1️ PMIDs already present in DB
     existing_pmids = {
         r[0]
         for r in db.query(Literature.article_id)
-        .filter(Literature.project_id == project_id)
+        .filter(
+            Literature.project_id == project_id,
+            Literature.is_unique == True,
+            Literature.article_id == any_(
+                bindparam("run_pmids", list(run_pmids), type_=ARRAY(String))
+            )
+        )
         .all()
-    }
+    } if run_pmids else set()
 
     # 2️ Track PMIDs within THIS run
     seen_in_run = set()
 
-    for _, row in df.iterrows():
+    rows = []
+
+    for row in records:
         article_id = str(row.get("article_id"))
 
         if article_id in existing_pmids or article_id in seen_in_run:
@@ -31,32 +83,49 @@ def save_merged_to_db(df, db: Session, project_id: int):
         else:
             is_unique = True
 
-        record = Literature(
-            project_id=project_id,
-            article_id=article_id,
-            keyword_id=row.get("keyword_id"),
-            source=row.get("source", "PubMed"),
-
-            title=row.get("title"),
-            abstract=row.get("abstract"),
+        rows.append((
+            project_id,
+            article_id,
+            row.get("keyword_id"),
+            row.get("source", "PubMed"),
 
-            journal=row.get("journal"),
-            publication_year=row.get("publication_year"),
+            row.get("title"),
+            row.get("abstract"),
 
-            author=row.get("author", ""),
-            publication_type=row.get("publication_type"),
+            row.get("journal"),
+            row.get("publication_year"),
 
-            doi=row.get("doi"),
-            article_url=row.get("article_url"),
+            row.get("author", ""),
+            row.get("publication_type"),
 
-            is_unique=is_unique
-        )
+            row.get("doi"),
+            row.get("article_url"),
 
-        db.add(record)
-        inserted += 1
+            is_unique,
+        ))
 
         # Mark as seen
         seen_in_run.add(article_id)
 
+    if not rows:
+        return 0
+
+    # 3️ Bulk insert on the session's own connection / transaction.
+    # Whole run is one transaction; don't wait for the WAL flush on
+    # commit (affects only this transaction, a crash loses at most this run)
+    db.execute(text("SET LOCAL synchronous_commit = off"))
+
+    if len(rows) >= COPY_THRESHOLD:
+        bulk_insert_with_copy(db, rows)
+    else:
+        sql = (
+            f"INSERT INTO {Literature.__tablename__} "
+            f"({', '.join(LITERATURE_COLUMNS)}) "
+            f"VALUES ({', '.join(['%s'] * len(LITERATURE_COLUMNS))})"
+        )
+
+        with db.connection().connection.cursor() as cur:
+            cur.executemany(sql, rows)
+
     db.commit()
-    return inserted
+    return len(rows)
@@ -1,7 +1,9 @@
+from concurrent.futures import ThreadPoolExecutor
 from sqlalchemy.orm import Session
 from db.models.literature_model import Literature
 from db.models.primary_screening_model import PrimaryScreening
 from primary.primary_runner import (
+    LANGFLOW_WORKERS,
     call_langflow,
     read_ifu_from_bytes,
     clean_json_text,
@@ -11,7 +13,6 @@ from primary.primary_runner import (
 import logging
 
 logger = logging.getLogger(__name__)
-logging.basicConfig(level=logging.INFO)
 
 
 def run_primary_screening_for_project(
@@ -27,8 +28,10 @@ def run_primary_screening_for_project(
     # -------------------------------------------------
     # 2. Fetch unscreened articles
     # -------------------------------------------------
+    # Only the two columns used below, as Row tuples: no ORM
+    # entities carrying every text column of the article
     articles = (
-        db.query(Literature)
+        db.query(Literature.id, Literature.abstract)
         .filter(
             Literature.project_id == project_id,
             Literature.is_unique == True,
@@ -39,11 +42,19 @@ def run_primary_screening_for_project(
 
     screened = 0
 
-    for art in articles:
-        abstract = art.abstract or ""
+    # -------------------------------------------------
+    # 3. Langflow calls run concurrently (network-bound);
+    #    results come back in article order, DB work stays on this thread
+    # -------------------------------------------------
+    abstracts = [art.abstract or "" for art in articles]
 
-        result = call_langflow(ifu_text, abstract)
+    with ThreadPoolExecutor(max_workers=LANGFLOW_WORKERS) as executor:
+        results = list(executor.map(
+            lambda abstract: call_langflow(ifu_text, abstract),
+            abstracts
+        ))
 
+    for art, result in zip(articles, results):
         decision = "ERROR"
         exclusion = ""
         rationale = ""
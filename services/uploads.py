@@ -0,0 +1,52 @@
+import os
+import shutil
+import tempfile
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+def stage_upload(upload, dest_path: str, chunk_size: int = UPLOAD_CHUNK_SIZE) -> str:
+    """
+    Copies an UploadFile in fixed-size chunks (bounded memory, no full
+    bytes copy) to a unique temp file in dest_path's directory, so
+    concurrent uploads to one path can't interleave. Returns the temp
+    path; os.replace() it onto dest_path to publish it.
+    Sync: call it from a sync endpoint or run_in_threadpool.
+    """
+    dest_dir = os.path.dirname(dest_path) or "."
+    os.makedirs(dest_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(
+        dir=dest_dir, prefix=f".{os.path.basename(dest_path)}.", suffix=".part"
+    )
+
+    upload.file.seek(0)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            shutil.copyfileobj(upload.file, f, length=chunk_size)
+        os.chmod(tmp_path, 0o644)   # mkstemp creates 0600
+    except BaseException:
+        discard_staged(tmp_path)
+        raise
+
+    return tmp_path
+
+
+def discard_staged(tmp_path: str):
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+
+def save_upload(upload, dest_path: str, chunk_size: int = UPLOAD_CHUNK_SIZE) -> int:
+    """
+    Streams an UploadFile to dest_path via stage_upload, renamed into
+    place so readers never see a half-written file. Returns the size in bytes.
+    """
+    tmp_path = stage_upload(upload, dest_path, chunk_size)
+    try:
+        size = os.path.getsize(tmp_path)
+        os.replace(tmp_path, dest_path)
+    except BaseException:
+        discard_staged(tmp_path)
+        raise
+
+    return size